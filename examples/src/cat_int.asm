@@ -0,0 +1,16 @@
+org 10
+out_port:
+    .word 0
+in_port:
+    .word 2
+
+_start:
+    ei
+    wait:
+        hlt
+        jmp wait
+
+_int:
+    in in_port
+    out out_port
+    iret
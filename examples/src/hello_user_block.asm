@@ -0,0 +1,14 @@
+org 10
+
+greet_mess:
+    .word 7, 'Hello, '
+
+_start:
+    outs greet_mess
+    ins buffer
+    outs buffer
+    hlt
+
+; capacity of the buffer, symbols are stored right after it
+buffer:
+    .word 32
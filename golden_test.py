@@ -32,7 +32,14 @@ def test_translator_and_machine(golden, caplog):
         with contextlib.redirect_stdout(io.StringIO()) as stdout:
             translator.main(source, target)
             print("============================================================")
-            machine.main(target, input_stream)
+            machine.main(
+                target,
+                input_stream,
+                golden.get("in_cache"),
+                golden.get("in_prefetch", False),
+                golden.get("in_schedule", False),
+                golden.get("in_dual_port", False),
+            )
 
         # Выходные данные также считываем в переменные.
         with open(target, encoding="utf-8") as file:
@@ -22,14 +22,31 @@ class Opcode(str, Enum):
     HLT: str = "HLT"
     CMP: str = "CMP"
     NOP: str = "NOP"
+    INS: str = "INS"
+    OUTS: str = "OUTS"
+    EI: str = "EI"
+    DI: str = "DI"
+    IRET: str = "IRET"
 
     def __str__(self) -> str:
         return str(self.value)
 
 
 branch_commands: str = [Opcode.JZ, Opcode.JNZ, Opcode.JMP, Opcode.JG]
+interrupt_vector: int = 1
+interrupt_commands: str = [Opcode.EI, Opcode.DI, Opcode.IRET]
 non_operand_commands: str = [Opcode.INC, Opcode.DEC, Opcode.HLT, Opcode.POP, Opcode.PUSH]
-operand_commands: str = [Opcode.ADD, Opcode.OUT, Opcode.LD, Opcode.CMP, Opcode.ST, Opcode.AND, Opcode.IN]
+operand_commands: str = [
+    Opcode.ADD,
+    Opcode.OUT,
+    Opcode.LD,
+    Opcode.CMP,
+    Opcode.ST,
+    Opcode.AND,
+    Opcode.IN,
+    Opcode.INS,
+    Opcode.OUTS,
+]
 
 
 def get_opcode(str_opcode) -> Opcode:
@@ -51,6 +68,11 @@ def get_opcode(str_opcode) -> Opcode:
         "hlt": Opcode.HLT,
         "cmp": Opcode.CMP,
         "nop": Opcode.NOP,
+        "ins": Opcode.INS,
+        "outs": Opcode.OUTS,
+        "ei": Opcode.EI,
+        "di": Opcode.DI,
+        "iret": Opcode.IRET,
     }.get(str_opcode, Opcode.NOP)
 
 
@@ -62,6 +84,8 @@ class Mux(str, Enum):
     FROM_SP: str = "from_sp"
     FROM_INPUT: str = "from_input"
     FROM_PS: str = "from_ps"
+    FROM_CR: str = "from_cr"
+    FROM_ADDR: str = "from_addr"
 
     def __str__(self):
         return str(self.value)
@@ -73,6 +97,7 @@ class ALUOpcode(str, Enum):
     DEC_A = "dec_a"
     DEC_B = "dec_b"
     ADD = "add"
+    SUB = "sub"
     CMP = "cmp"
     AND = "and"
     NEXT_IN_A = "next_in_a"
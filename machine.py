@@ -1,11 +1,21 @@
 #!/usr/bin/python3
 from __future__ import annotations
 
+import json
 import logging
 import sys
 from typing import ClassVar
 
-from isa import ALUOpcode, Mux, Opcode, non_operand_commands, operand_commands, read_code
+from isa import (
+    ALUOpcode,
+    Mux,
+    Opcode,
+    interrupt_commands,
+    interrupt_vector,
+    non_operand_commands,
+    operand_commands,
+    read_code,
+)
 
 
 class ExitExceptionError(Exception):
@@ -14,6 +24,60 @@ class ExitExceptionError(Exception):
         super().__init__(self.message)
 
 
+class Cache:
+    sets: ClassVar[int] = None
+    ways: ClassVar[int] = None
+    line_size: ClassVar[int] = None
+    miss_penalty: ClassVar[int] = None
+    lines: ClassVar[list] = None
+    hits: ClassVar[int] = None
+    misses: ClassVar[int] = None
+
+    def __init__(self, sets: int, ways: int, line_size: int, miss_penalty: int):
+        self.sets = sets
+        self.ways = ways
+        self.line_size = line_size
+        self.miss_penalty = miss_penalty
+        # tags of every set, least recently used first
+        self.lines = [[] for _ in range(sets)]
+        self.hits = 0
+        self.misses = 0
+
+    def access(self, address: int) -> int:
+        block = address // self.line_size
+        index = block % self.sets
+        tag = block // self.sets
+        line = self.lines[index]
+        if tag in line:
+            line.remove(tag)
+            line.append(tag)
+            self.hits += 1
+            return 0
+        if len(line) == self.ways:
+            line.pop(0)
+        line.append(tag)
+        self.misses += 1
+        return self.miss_penalty
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+
+class InterruptReturnError(Exception):
+    def __init__(self, pc):
+        self.message = f"IRET outside of interrupt handler at {pc}"
+        super().__init__(self.message)
+
+
+class InterruptVectorError(Exception):
+    def __init__(self, vector):
+        self.message = f"Interrupt vector at {vector} is not set"
+        super().__init__(self.message)
+
+
 class DataPath:
     acc: ClassVar[int] = None
     alu: ClassVar = None
@@ -26,12 +90,25 @@ class DataPath:
     pc: ClassVar[int] = None
     ps: ClassVar = {}
     mr: ClassVar[int] = None
+    cr: ClassVar[int] = None
+    cache: ClassVar[Cache] = None
+    stall: ClassVar[int] = None
+    bus_addr: ClassVar[int] = None
+    port_busy: ClassVar[int] = None
+    pb: ClassVar = None
+    pb_addr: ClassVar[int] = None
     output_buf_num: ClassVar[list] = None
     output_buf_sym: ClassVar[list] = None
     input_buf: ClassVar[list] = None
 
-    def __init__(self, capacity: int, input_buf):
+    def __init__(self, capacity: int, input_buf, cache: Cache | None = None):
         self.alu = ALU()
+        self.cache = cache
+        self.stall = 0
+        self.bus_addr = None
+        self.port_busy = 0
+        self.pb = None
+        self.pb_addr = None
         self.mem_capacity = capacity
         self.input_buf = input_buf
         self.mem = [{"opcode": Opcode.NOP.value, "value": 0}] * self.mem_capacity
@@ -41,6 +118,7 @@ class DataPath:
         self.pc = 0
         self.ps = {"Z": self.alu.flag_z, "N": self.alu.flag_n}
         self.mr = 0
+        self.cr = 0
         self.acc = 0
         self.output_buf_sym = []
         self.output_buf_num = []
@@ -56,15 +134,67 @@ class DataPath:
     def latch_mr(self):
         self.mr = self.alu.result
 
+    def access_memory(self):
+        # several latches of the same word within one tick are a single memory transaction
+        if self.addr == self.bus_addr:
+            return
+        self.bus_addr = self.addr
+        if self.cache is not None:
+            self.stall += self.cache.access(self.addr)
+
+    def end_tick(self) -> int:
+        # the port stays busy for the whole transaction, including the miss penalty
+        if self.bus_addr is not None:
+            self.port_busy += 1 + self.stall
+        stall = self.stall
+        self.stall = 0
+        self.bus_addr = None
+        return stall
+
     def latch_instr(self):
+        self.access_memory()
         self.ir = self.mem[self.addr]  # add exceptions
 
     def latch_dr(self):
+        self.access_memory()
         self.dr = self.mem[self.addr]["value"]
 
+    def latch_prefetch(self) -> int:
+        # prefetch buffer reads mem[PC] through its own address path, returns the miss penalty
+        self.pb_addr = self.pc
+        self.pb = self.mem[self.pc]
+        if self.cache is not None:
+            return self.cache.access(self.pc)
+        return 0
+
+    def flush_prefetch(self):
+        self.pb = None
+        self.pb_addr = None
+
+    def latch_instr_from_prefetch(self):
+        self.ir = self.pb
+        self.dr = self.pb["value"]
+        self.flush_prefetch()
+
     def latch_pc(self):
         self.pc = self.alu.result % self.mem_capacity
 
+    def latch_int_address(self, vector: int):
+        self.addr = vector
+
+    def restore_pc(self, pc: int):
+        self.pc = pc
+
+    def restore_flags(self, ps: dict):
+        self.alu.flag_n = ps["N"]
+        self.alu.flag_z = ps["Z"]
+
+    def latch_cr(self):
+        self.cr = self.alu.result
+
+    def clear_cr(self):
+        self.cr = 0
+
     def latch_sp(self):
         self.sp = self.alu.result * self.mem_capacity
 
@@ -86,8 +216,9 @@ class DataPath:
         else:
             assert ValueError(f"Wrong mux  {mux.value!s}")
 
-    def latch_output(self):
-        port_type = self.dr
+    def latch_output(self, port_type: int | None = None):
+        if port_type is None:
+            port_type = self.dr
         # symbol
         if port_type == 0:
             ch = chr(self.acc)
@@ -99,6 +230,9 @@ class DataPath:
             self.output_buf_num.append(ch)
 
     def latch_wr(self):
+        self.access_memory()
+        if self.addr == self.pb_addr:
+            self.flush_prefetch()
         self.mem[self.addr] = {
             "index": self.addr,
             "opcode": Opcode.NOP.value,
@@ -106,50 +240,126 @@ class DataPath:
             "is_indirect": False,
         }
 
+    def left_route(self, mux_a: Mux):
+        if mux_a == Mux.FROM_ACC:
+            return self.acc
+        if mux_a == Mux.FROM_PS:
+            if self.ps["N"]:
+                n = 1
+            else:
+                n = 0
+            if self.ps["Z"]:
+                z = 1
+            else:
+                z = 0
+            return n * 10 + z
+        if mux_a == Mux.FROM_CR:
+            return self.cr
+        if mux_a == Mux.FROM_ADDR:
+            return self.addr
+        assert ValueError(f"Wrong left mux:  {mux_a.value}")
+        return None
+
+    def right_route(self, mux_b: Mux):
+        if mux_b == Mux.FROM_DR:
+            return self.dr
+        if mux_b == Mux.FROM_PC:
+            return self.pc
+        if mux_b == Mux.FROM_SP:
+            return self.sp
+        if mux_b == Mux.FROM_ADDR:
+            return self.addr
+        if mux_b == Mux.FROM_CR:
+            return self.cr
+        assert ValueError(f"Wrong right mux:  {mux_b.value}")
+        return None
+
     def alu_execution(self, op: object, mux_a: Mux = None, mux_b: Mux = None) -> object:
         route_a = None
         route_b = None
         if mux_a is not None:
-            if mux_a == Mux.FROM_ACC:
-                route_a = self.acc
-            elif mux_a == Mux.FROM_PS:
-                if self.ps["N"]:
-                    n = 1
-                else:
-                    n = 0
-                if self.ps["Z"]:
-                    z = 1
-                else:
-                    z = 0
-                route_a = n * 10 + z
-            else:
-                assert ValueError(f"Wrong left mux:  {mux_a.value}")
+            route_a = self.left_route(mux_a)
         if mux_b is not None:
-            if mux_b == Mux.FROM_DR:
-                route_b = self.dr
-            elif mux_b == Mux.FROM_PC:
-                route_b = self.pc
-            elif mux_b == Mux.FROM_SP:
-                route_b = self.sp
-            else:
-                assert ValueError(f"Wrong right mux:  {mux_b.value}")
+            route_b = self.right_route(mux_b)
         self.alu.set_alu(route_a, route_b, op)
         self.alu.calc()
 
 
+class InterruptController:
+    vector: ClassVar[int] = interrupt_vector
+    schedule: ClassVar[list] = None
+    enabled: ClassVar[bool] = None
+    saved_pc: ClassVar[int] = None
+    saved_ps: ClassVar[dict] = None
+    in_handler: ClassVar[bool] = None
+    count: ClassVar[int] = None
+
+    def __init__(self, schedule: list):
+        self.schedule = sorted(schedule, key=lambda item: item[0])
+        self.enabled = False
+        self.saved_pc = 0
+        self.saved_ps = {"N": False, "Z": False}
+        self.in_handler = False
+        self.count = 0
+
+    def deliver(self, tick: int, input_buf: list):
+        while len(self.schedule) != 0 and self.schedule[0][0] <= tick:
+            _, symbol = self.schedule.pop(0)
+            input_buf.append(symbol)
+
+    def next_arrival(self) -> int | None:
+        if len(self.schedule) == 0:
+            return None
+        return self.schedule[0][0]
+
+    def has_request(self, input_buf: list) -> bool:
+        return self.enabled and len(input_buf) != 0
+
+
 class ControlUnit:
     data_path = None
+    interrupt_controller = None
     inst_count = None
     ticks = None
-
-    def __init__(self, data_path: DataPath, program):
+    pipelined = None
+    dual_port = None
+    prefetch_issued = None
+    prefetch_issued_at = None
+    prefetch_busy_at = None
+    prefetch_cost = None
+    stalls = None
+    flushes = None
+    port_conflicts = None
+
+    def __init__(
+        self,
+        data_path: DataPath,
+        program,
+        schedule: list | None = None,
+        pipelined: bool = False,
+        dual_port: bool = False,
+    ):
         self.data_path = data_path
+        self.interrupt_controller = InterruptController(schedule or [])
         self.inst_count = 0
         self.ticks = 0
+        self.pipelined = pipelined
+        self.dual_port = dual_port
+        self.prefetch_issued = False
+        self.prefetch_issued_at = 0
+        self.prefetch_busy_at = 0
+        self.prefetch_cost = 0
+        self.stalls = 0
+        self.flushes = 0
+        self.port_conflicts = 0
         data_path.put_program_into_memory(program)
 
     def inc_ticks(self):
-        self.ticks += 1
+        self.ticks += 1 + self.data_path.end_tick()
+
+    def inc_stall_ticks(self):
+        # memory access at the end of an instruction without its own tick: only the miss penalty is added
+        self.ticks += self.data_path.end_tick()
 
     def get_ticks(self):
         return self.ticks
@@ -164,6 +374,45 @@ class ControlUnit:
         self.data_path.latch_dr()
         self.inc_ticks()
 
+    def prefetched_fetch(self):
+        # the next instruction is fetched while the current one is executing
+        if self.prefetch_issued and self.data_path.pb_addr == self.data_path.pc:
+            waiting_start = self.ticks
+            ready = waiting_start + self.prefetch_left()
+            while self.ticks < ready:
+                self.inc_ticks()
+            self.stalls += self.ticks - waiting_start
+            self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_PC)
+            self.data_path.latch_address()
+            self.data_path.alu_execution(ALUOpcode.INC_B, mux_b=Mux.FROM_PC)
+            self.data_path.latch_pc()
+            self.data_path.latch_instr_from_prefetch()
+        else:
+            # invalidated by a write to the prefetched address or by an interrupt
+            self.flush_prefetch()
+            self.instruction_fetch()
+        self.prefetch_cost = 2 + self.data_path.latch_prefetch()
+        self.prefetch_issued_at = self.ticks
+        self.prefetch_busy_at = self.data_path.port_busy
+        self.prefetch_issued = True
+
+    def prefetch_left(self) -> int:
+        # prefetch needs prefetch_cost ticks of the memory port; with a single port
+        # the ticks in which the executing instruction used memory do not count
+        elapsed = self.ticks - self.prefetch_issued_at
+        busy = 0
+        if not self.dual_port:
+            busy = min(self.data_path.port_busy - self.prefetch_busy_at, elapsed)
+        left = max(0, self.prefetch_cost - elapsed + busy)
+        self.port_conflicts += left - max(0, self.prefetch_cost - elapsed)
+        return left
+
+    def flush_prefetch(self):
+        if self.prefetch_issued:
+            self.flushes += 1
+            self.prefetch_issued = False
+        self.data_path.flush_prefetch()
+
     def abstract_execution(self):
         ir = self.data_path.ir
         ps = self.data_path.ps
@@ -180,6 +429,8 @@ class ControlUnit:
             self.inc_ticks()
         if opcode in operand_commands:
             self.operand_execute(opcode)
+        elif opcode in interrupt_commands:
+            self.interrupt_execute(opcode)
         elif opcode in non_operand_commands:
             self.non_operand_execute(opcode)
         else:
@@ -187,7 +438,9 @@ class ControlUnit:
 
     def non_operand_execute(self, opcode: Opcode):
         if opcode == Opcode.HLT:
-            raise ExitExceptionError(Opcode.HLT)
+            if not self.wait_for_interrupt():
+                raise ExitExceptionError(Opcode.HLT)
+            return
         if opcode == Opcode.INC:
             self.data_path.alu_execution(ALUOpcode.INC_A, mux_a=Mux.FROM_ACC)
             self.data_path.latch_acc(Mux.FROM_ACC)
@@ -218,6 +471,55 @@ class ControlUnit:
             self.data_path.latch_acc(Mux.FROM_ACC)
             self.inc_ticks()
 
+    def interrupt_execute(self, opcode: Opcode):
+        controller = self.interrupt_controller
+        if opcode == Opcode.EI:
+            controller.enabled = True
+            self.inc_ticks()
+        elif opcode == Opcode.DI:
+            controller.enabled = False
+            self.inc_ticks()
+        elif opcode == Opcode.IRET:
+            if not controller.in_handler:
+                raise InterruptReturnError(self.data_path.pc - 1)
+            controller.in_handler = False
+            self.data_path.restore_pc(controller.saved_pc)
+            self.data_path.restore_flags(controller.saved_ps)
+            controller.enabled = True
+            self.inc_ticks()
+
+    def interrupt_entry(self):
+        controller = self.interrupt_controller
+        controller.enabled = False
+        controller.in_handler = True
+        controller.saved_pc = self.data_path.pc
+        controller.saved_ps = dict(self.data_path.ps)
+        controller.count += 1
+        self.data_path.latch_int_address(controller.vector)
+        self.data_path.latch_dr()
+        self.inc_ticks()
+        # address 0 holds jmp _start, so a zero vector means there is no handler
+        if self.data_path.dr == 0:
+            raise InterruptVectorError(controller.vector)
+        self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+        self.data_path.latch_pc()
+        self.inc_ticks()
+        logging.debug(f"INTERRUPT saved PC {controller.saved_pc} -> {self.data_path.pc}")
+
+    def wait_for_interrupt(self) -> bool:
+        # hlt with enabled interrupts idles until the next symbol arrives
+        controller = self.interrupt_controller
+        if not controller.enabled:
+            return False
+        if len(self.data_path.input_buf) != 0:
+            return True
+        arrival = controller.next_arrival()
+        if arrival is None:
+            return False
+        while self.ticks < arrival:
+            self.inc_ticks()
+        return True
+
     def operand_execute(self, opcode: Opcode):
         if opcode == Opcode.ADD:
             self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
@@ -264,33 +566,94 @@ class ControlUnit:
             self.inc_ticks()
             self.data_path.latch_dr()
             self.data_path.latch_output()
+            self.inc_stall_ticks()
         elif opcode == Opcode.IN:
             self.data_path.latch_acc(Mux.FROM_INPUT)
             self.inc_ticks()
+        elif opcode == Opcode.OUTS:
+            self.block_output_execute()
+        elif opcode == Opcode.INS:
+            self.block_input_execute()
+
+    def block_output_execute(self):
+        # pstr: mem[DR] -- length, mem[DR + 1 .. DR + length] -- symbols
+        self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+        self.data_path.latch_address()
+        self.data_path.latch_dr()
+        self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+        self.data_path.latch_cr()
+        self.inc_ticks()
+        while True:
+            # length <= 0 is an empty string, symbols past the end of memory are not read
+            is_done = self.data_path.alu.flag_z or self.data_path.alu.flag_n
+            if is_done or self.data_path.addr + 1 >= self.data_path.mem_capacity:
+                break
+            self.data_path.alu_execution(ALUOpcode.INC_B, mux_b=Mux.FROM_ADDR)
+            self.data_path.latch_address()
+            self.data_path.latch_dr()
+            self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+            self.data_path.latch_acc(Mux.FROM_ACC)
+            self.data_path.latch_output(0)
+            self.data_path.alu_execution(ALUOpcode.DEC_A, mux_a=Mux.FROM_CR)
+            self.data_path.latch_cr()
+            self.inc_ticks()
+
+    def block_input_execute(self):
+        # mem[DR] -- buffer capacity, read input until it is empty or the buffer is full,
+        # then store the length into mem[DR] (pstr)
+        self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+        self.data_path.latch_address()
+        self.data_path.latch_dr()
+        self.data_path.clear_cr()
+        self.inc_ticks()
+        while True:
+            self.data_path.alu_execution(ALUOpcode.CMP, mux_a=Mux.FROM_CR, mux_b=Mux.FROM_DR)
+            is_full = self.data_path.alu.flag_z or self.data_path.addr + 1 >= self.data_path.mem_capacity
+            if is_full or len(self.data_path.input_buf) == 0:
+                self.inc_ticks()
+                break
+            self.data_path.latch_acc(Mux.FROM_INPUT)
+            self.data_path.alu_execution(ALUOpcode.NEXT_IN_A, mux_a=Mux.FROM_ACC)
+            self.data_path.latch_mr()
+            self.data_path.alu_execution(ALUOpcode.INC_B, mux_b=Mux.FROM_ADDR)
+            self.data_path.latch_address()
+            self.data_path.latch_wr()
+            self.data_path.alu_execution(ALUOpcode.INC_A, mux_a=Mux.FROM_CR)
+            self.data_path.latch_cr()
+            self.inc_ticks()
+        self.data_path.alu_execution(ALUOpcode.SUB, mux_a=Mux.FROM_ADDR, mux_b=Mux.FROM_CR)
+        self.data_path.latch_address()
+        self.data_path.alu_execution(ALUOpcode.NEXT_IN_A, mux_a=Mux.FROM_CR)
+        self.data_path.latch_mr()
+        self.data_path.latch_wr()
+        self.data_path.latch_acc(Mux.FROM_ACC)
+        self.inc_ticks()
 
     def branch_execute(self, opcode: Opcode, ps: dict):
+        taken = False
         if opcode == Opcode.JMP:
-            self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
-            self.data_path.latch_pc()
-            self.inc_ticks()
+            taken = True
         elif opcode == Opcode.JZ:
-            if ps["Z"]:
-                self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
-                self.data_path.latch_pc()
-                self.inc_ticks()
+            taken = ps["Z"]
         elif opcode == Opcode.JNZ:
-            if not ps["Z"]:
-                self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
-                self.data_path.latch_pc()
-                self.inc_ticks()
+            taken = not ps["Z"]
         elif opcode == Opcode.JG:
-            if not ps["N"]:
-                self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
-                self.data_path.latch_pc()
-                self.inc_ticks()
+            taken = not ps["N"]
+        if taken:
+            self.data_path.alu_execution(ALUOpcode.NEXT_IN_B, mux_b=Mux.FROM_DR)
+            self.data_path.latch_pc()
+            self.inc_ticks()
+            if self.pipelined:
+                self.flush_prefetch()
 
     def run_fetches(self):
-        self.instruction_fetch()
+        self.interrupt_controller.deliver(self.ticks, self.data_path.input_buf)
+        if self.interrupt_controller.has_request(self.data_path.input_buf):
+            self.interrupt_entry()
+        if self.pipelined:
+            self.prefetched_fetch()
+        else:
+            self.instruction_fetch()
         self.abstract_execution()
         self.data_path.latch_flags()
         logging.debug(self.self_shot())
@@ -321,6 +684,7 @@ class ALU:
         ALUOpcode.DEC_A,
         ALUOpcode.DEC_B,
         ALUOpcode.ADD,
+        ALUOpcode.SUB,
         ALUOpcode.CMP,
         ALUOpcode.AND,
         ALUOpcode.NEXT_IN_A,
@@ -328,10 +692,16 @@ class ALU:
     ]
     operation: ClassVar[ALUOpcode] = None
 
+    def compare(self):
+        # AND and CMP only set flags, the result register is kept
+        if self.operation == ALUOpcode.AND:
+            return self.route_a & self.route_b
+        return self.route_a - self.route_b
+
     def calc(self):
         buf = None
-        if self.operation == ALUOpcode.AND:
-            buf = self.route_a & self.route_b
+        if self.operation in (ALUOpcode.AND, ALUOpcode.CMP):
+            buf = self.compare()
         if self.operation == ALUOpcode.INC_A:
             self.result = self.route_a + 1
         if self.operation == ALUOpcode.INC_B:
@@ -340,10 +710,10 @@ class ALU:
             self.result = self.route_a - 1
         if self.operation == ALUOpcode.DEC_B:
             self.result = self.route_b
-        if self.operation == ALUOpcode.CMP:
-            buf = self.route_a - self.route_b
         if self.operation == ALUOpcode.ADD:
             self.result = self.route_a + self.route_b
+        if self.operation == ALUOpcode.SUB:
+            self.result = self.route_a - self.route_b
         if self.operation == ALUOpcode.NEXT_IN_A:
             self.result = self.route_a
         if self.operation == ALUOpcode.NEXT_IN_B:
@@ -384,9 +754,39 @@ def read_data(file) -> list:
     return input_token
 
 
-def simulation(code: list, input_token: list, mem_capacity: int, bound: int):
-    data_path = DataPath(mem_capacity, input_token)
-    control_unit = ControlUnit(data_path, code)
+def parse_schedule(input_token: list) -> list:
+    # scheduled input: JSON list of [tick, symbol] pairs, e.g. [[10, "a"], [25, "b"]]
+    schedule = json.loads("".join(input_token))
+    assert isinstance(schedule, list), "Wrong schedule: expected a list of [tick, symbol] pairs"
+    for item in schedule:
+        assert isinstance(item, list), f"Wrong schedule item: {item}"
+        assert len(item) == 2, f"Wrong schedule item: {item}"
+        assert isinstance(item[0], int), f"Wrong schedule item: {item}"
+        assert isinstance(item[1], str), f"Wrong schedule item: {item}"
+        assert len(item[1]) == 1, f"Wrong schedule item: {item}"
+    return [(tick, symbol) for tick, symbol in schedule]
+
+
+def parse_cache(config: str) -> Cache:
+    # <sets>:<ways>:<line_size>:<miss_penalty>, ways == 1 -- direct-mapped cache
+    sets, ways, line_size, miss_penalty = (int(x) for x in config.split(":"))
+    assert min(sets, ways, line_size) > 0, f"Wrong cache configuration: {config}"
+    assert miss_penalty >= 0, f"Wrong cache configuration: {config}"
+    return Cache(sets, ways, line_size, miss_penalty)
+
+
+def simulation(
+    code: list,
+    input_token: list,
+    mem_capacity: int,
+    bound: int,
+    schedule: list | None = None,
+    cache: Cache | None = None,
+    pipelined: bool = False,
+    dual_port: bool = False,
+):
+    data_path = DataPath(mem_capacity, input_token, cache)
+    control_unit = ControlUnit(data_path, code, schedule, pipelined, dual_port)
     instr_counter = 0
     try:
         while instr_counter < bound:
@@ -394,11 +794,25 @@ def simulation(code: list, input_token: list, mem_capacity: int, bound: int):
             instr_counter += 1
     except ExitExceptionError:
         pass
+    except (InterruptReturnError, InterruptVectorError) as e:
+        logging.warning(e.message)
 
     if instr_counter > bound:
         logging.warning("Limit exceeded!")
     logging.info("symbol_buffer: %s", repr("".join(data_path.output_buf_sym)))
     logging.info("numeric_buffer: [%s]", ", ".join(str(x) for x in data_path.output_buf_num))
+    if cache is not None:
+        logging.info("cache: hits %d, misses %d, hit rate %.2f", cache.hits, cache.misses, cache.hit_rate())
+    if control_unit.interrupt_controller.count != 0:
+        logging.info("interrupts: %d", control_unit.interrupt_controller.count)
+    if pipelined:
+        logging.info(
+            "prefetch (%s): stalls %d, flushes %d, port conflicts %d",
+            "dual port" if dual_port else "single port",
+            control_unit.stalls,
+            control_unit.flushes,
+            control_unit.port_conflicts,
+        )
     return (
         data_path.output_buf_sym,
         data_path.output_buf_num,
@@ -407,22 +821,40 @@ def simulation(code: list, input_token: list, mem_capacity: int, bound: int):
     )
 
 
-def main(source, file):
+def main(source, file, cache_config=None, pipelined=False, scheduled=False, dual_port=False):
     code = read_code(source)
     input_tokens = read_data(file)
+    schedule = None
+    if scheduled:
+        schedule = parse_schedule(input_tokens)
+        input_tokens = []
     mem_size = 300
     bound = 5000
-    symbols, nums, instr_counter, ticks_counter = simulation(code, input_tokens, mem_size, bound)
+    cache = None
+    if cache_config is not None:
+        cache = parse_cache(cache_config)
+    symbols, nums, instr_counter, ticks_counter = simulation(
+        code, input_tokens, mem_size, bound, schedule, cache, pipelined, dual_port
+    )
 
     print("".join(symbols))
     if len(nums) != 0:
         print(nums)
     print("count of instructions: ", instr_counter)
     print("count of ticks: ", ticks_counter)
+    if cache is not None:
+        print("cache hit rate: ", round(cache.hit_rate(), 2))
 
 
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.DEBUG)
-    assert len(sys.argv) == 3, "Wrong arguments: machine.py <code_file> <input_file>"
-    _, code_file, input_file = sys.argv
-    main(code_file, input_file)
+    flags = ["--prefetch", "--schedule", "--dual-port"]
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    usage = "machine.py <code_file> <input_file> [<cache_config>] [--prefetch] [--dual-port] [--schedule]"
+    assert len(args) in (2, 3), f"Wrong arguments: {usage}"
+    main(
+        *args,
+        pipelined="--prefetch" in sys.argv,
+        scheduled="--schedule" in sys.argv,
+        dual_port="--dual-port" in sys.argv,
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 import sys
 from typing import TypedDict
 
-from isa import Opcode, get_opcode, write_code
+from isa import Opcode, get_opcode, interrupt_vector, write_code
 
 
 class Stage1Result(TypedDict):
@@ -43,10 +43,10 @@ def find_org(lines) -> int:
     return 0
 
 
-def find_start(labels) -> int:
+def find_label(labels, name) -> int:
     position = None
     for index, label in labels.items():
-        if label == "_start":
+        if label == name:
             position = index
     return position
 
@@ -123,8 +123,11 @@ def stage_2(l_tokens, m_tokens) -> dict:
     return buf
 
 
-def stage_3(r_code, start):
+def stage_3(r_code, start, handler=None):
     code = [{"index": 0, "opcode": Opcode.JMP, "value": start, "is_indirect": False}]
+    if handler is not None:
+        assert interrupt_vector not in r_code, f"Program overlaps the interrupt vector at {interrupt_vector}"
+        code.append({"index": interrupt_vector, "opcode": Opcode.NOP, "value": handler, "is_indirect": False})
     for index, token in r_code.items():
         if len(token) == 2:
             code.append(
@@ -145,9 +148,13 @@ def translate(lines):
     org: int = find_org(lines)
     lines = clean(lines)
     l_tokens, m_tokens = stage_1(lines, org)
-    start: int = find_start(l_tokens)
+    start: int = find_label(l_tokens, "_start")
+    handler: int = find_label(l_tokens, "_int")
+    if handler is None:
+        for token in m_tokens.values():
+            assert token[0] != "ei", "ei without an interrupt handler: label _int is not defined"
     r_code = stage_2(l_tokens, m_tokens)
-    return stage_3(r_code, start)
+    return stage_3(r_code, start, handler)
 
 
 def main(code_source_file, code_target):